@@ -1,6 +1,11 @@
 import streamlit as st
-import json
-import requests  # Using direct HTTP requests for stability
+import orjson
+import csv
+import io
+import hashlib
+import html
+import re
+import httpx  # Direct HTTP calls to Groq's OpenAI-compatible API instead of the SDK
 
 # --- Configuration & CSS Injection ---
 st.set_page_config(
@@ -10,7 +15,7 @@ st.set_page_config(
 )
 
 # Injecting the exact CSS provided
-st.markdown("""
+_CSS = """
 <style>
     :root { --brand: #3182ce; --bg: #ffffff; }
     .stApp { background-color: var(--bg); font-family: sans-serif; }
@@ -64,10 +69,20 @@ st.markdown("""
     .status-pass { color: #1a7f37; font-weight: bold; margin-right: 8px;}
     .status-fail { color: #cf222e; font-weight: bold; margin-right: 8px;}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# st.html skips the markdown parsing pass that st.markdown(unsafe_allow_html=True) performs
+st.html(_CSS)
 
 # --- Scoring Logic ---
-GEO_CRITERIA = [
+BATCH_LIMIT = 25  # Keeps one batched prompt and its JSON reply well inside the context window
+
+SCORING_MODEL = "llama-3.1-8b-instant"  # Fast default for the short, tightly structured verdict
+LARGE_SCORING_MODEL = "llama-3.3-70b-versatile"  # Optional stronger judge, selectable in the sidebar
+SCORE_MAX_TOKENS = 512  # A single verdict is ~300 tokens; stop the model running past the JSON
+BATCH_MAX_TOKENS_PER_ITEM = 96  # Score plus a one-sentence summary per description
+
+GEO_CRITERIA = (
     "User Intent Alignment",
     "Competitive Differentiation", 
     "Social Proof / Reviews",
@@ -77,24 +92,16 @@ GEO_CRITERIA = [
     "Urgency / Call to Action",
     "Scannability (Formatting/Bullets)",
     "Factual Preservation"
-]
+)
 
-def analyze_description_raw(api_key, text):
-    """
-    Uses standard Python 'requests' instead of the SDK to avoid connection errors.
-    """
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    prompt = f"""
+# Prompt templates live at module scope; calls only fill in the precomputed criteria and the text.
+_GEO_CRITERIA_STR = ', '.join(GEO_CRITERIA)
+
+_ANALYZE_PROMPT_TEMPLATE = """
     You are a strict judge for E-Commerce Product Descriptions based on the "E-GEO" academic paper.
     
     Score this description out of 100 based on these 9 criteria:
-    {', '.join(GEO_CRITERIA)}
+    {criteria}
     
     Return ONLY valid JSON:
     {{
@@ -111,41 +118,298 @@ def analyze_description_raw(api_key, text):
 
     Description: "{text}"
     """
+
+_BATCH_PROMPT_TEMPLATE = """
+    You are a strict judge for E-Commerce Product Descriptions based on the "E-GEO" academic paper.
     
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [
-            {"role": "system", "content": "Return JSON only."},
-            {"role": "user", "content": prompt}
-        ],
-        "response_format": {"type": "json_object"},
-        "temperature": 0.1
-    }
+    Score each of the {count} numbered descriptions below out of 100 based on these 9 criteria:
+    {criteria}
     
+    Return ONLY valid JSON with exactly {count} results, in input order:
+    {{
+        "results": [
+            {{ "score": <integer>, "critique_summary": "<One sentence explaining the score>" }}
+        ]
+    }}
+
+    Descriptions:
+    {numbered}
+    """
+
+# Expected shape of the model's JSON, checked after parsing so malformed verdicts are never cached
+ANALYZE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "critique_summary": {"type": "string"},
+        "breakdown": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "properties": {
+                    "status": {"type": "string", "enum": ["Pass", "Fail"]},
+                    "comment": {"type": "string"}
+                },
+                "required": ["status", "comment"]
+            }
+        }
+    },
+    "required": ["score", "critique_summary", "breakdown"]
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "score": {"type": "integer", "minimum": 0, "maximum": 100},
+                    "critique_summary": {"type": "string"}
+                },
+                "required": ["score", "critique_summary"]
+            }
+        }
+    },
+    "required": ["results"]
+}
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "integer": int}
+
+_NEWLINES = re.compile(r"\r?\n")
+
+# Persisted caches key on a function's own source and arguments, not on the module-level
+# prompts, schemas and limits it reads. Passing this fingerprint as an argument means any
+# edit to those stops old verdicts being served; bump _CACHE_REVISION for changes it cannot see.
+# Superseded entries are not deleted from disk; use "Clear cached scores" in the sidebar.
+_CACHE_REVISION = 1
+_PROMPT_VERSION = hashlib.sha256(orjson.dumps([
+    _CACHE_REVISION,
+    _ANALYZE_PROMPT_TEMPLATE,
+    _BATCH_PROMPT_TEMPLATE,
+    _GEO_CRITERIA_STR,
+    ANALYZE_SCHEMA,
+    BATCH_SCHEMA,
+    SCORE_MAX_TOKENS,
+    BATCH_MAX_TOKENS_PER_ITEM,
+])).hexdigest()[:16]
+
+@st.cache_resource
+def get_http_client():
+    """
+    One shared HTTP/2 client so keep-alive connections to Groq are reused across reruns.
+    """
+    # 30 second timeout to prevent hanging
+    return httpx.Client(http2=True, timeout=30.0, headers={"Content-Type": "application/json"})
+
+def normalize_description(text):
+    """
+    Canonicalizes pasted text so trivially different copies share one cache entry.
+    Line breaks are kept because formatting is itself a scored criterion.
+    """
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    return "\n".join(lines)
+
+def _post_chat(api_key, payload):
+    """
+    Sends one chat completion to Groq and returns the parsed JSON message content.
+    Raises on HTTP and network errors so callers (and caches) can decide what to do.
+    """
+    url = "https://api.groq.com/openai/v1/chat/completions"
+    
+    headers = {"Authorization": f"Bearer {api_key}"}
+    
+    response = get_http_client().post(url, headers=headers, content=orjson.dumps(payload))
+    response.raise_for_status()
+    completion = orjson.loads(response.content)
+    return orjson.loads(completion['choices'][0]['message']['content'])
+
+def _validate_json(value, schema, path="response"):
+    """
+    Minimal JSON-schema check covering the keywords used by ANALYZE_SCHEMA and BATCH_SCHEMA.
+    Raises ValueError naming the first offending field.
+    """
+    expected = _JSON_TYPES[schema["type"]]
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise ValueError(f"Model returned invalid JSON: '{path}' should be of type {schema['type']}.")
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"Model returned invalid JSON: '{path}' should be one of {schema['enum']}.")
+    if "minimum" in schema and value < schema["minimum"]:
+        raise ValueError(f"Model returned invalid JSON: '{path}' should be at least {schema['minimum']}.")
+    if "maximum" in schema and value > schema["maximum"]:
+        raise ValueError(f"Model returned invalid JSON: '{path}' should be at most {schema['maximum']}.")
+    
+    properties = schema.get("properties", {})
+    for key in schema.get("required", ()):
+        if key not in value:
+            raise ValueError(f"Model returned invalid JSON: '{path}' is missing '{key}'.")
+    for key, subschema in properties.items():
+        if key in value:
+            _validate_json(value[key], subschema, f"{path}.{key}")
+    if "additionalProperties" in schema:
+        for key, item in value.items():
+            if key not in properties:
+                _validate_json(item, schema["additionalProperties"], f"{path}.{key}")
+    if "items" in schema:
+        for i, item in enumerate(value):
+            _validate_json(item, schema["items"], f"{path}[{i}]")
+
+def _normalize_statuses(result):
+    """
+    Canonicalizes breakdown statuses to "Pass"/"Fail" in place, so a case variant
+    such as "pass" or "FAIL" from the model does not fail validation.
+    """
+    breakdown = result.get('breakdown') if isinstance(result, dict) else None
+    if not isinstance(breakdown, dict):
+        return
+    for details in breakdown.values():
+        if isinstance(details, dict) and isinstance(details.get('status'), str):
+            details['status'] = details['status'].strip().capitalize()
+
+def to_html(text):
+    """
+    Escapes model output for use inside the HTML bubbles and keeps its line breaks.
+    """
+    return _NEWLINES.sub("<br>", html.escape(str(text)))
+
+def _report_request_errors(func, *args):
+    """
+    Runs a Groq call and shows any failure in the UI instead of raising.
+    """
     try:
-        # 30 second timeout to prevent hanging
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            return json.loads(response.json()['choices'][0]['message']['content'])
-        else:
-            st.error(f"API Error ({response.status_code}): {response.text}")
-            return None
-    except requests.exceptions.ConnectionError:
-        st.error("Connection Error: Could not reach Groq servers. Check your internet connection.")
+        return func(*args)
+    except httpx.HTTPStatusError as e:
+        st.error(f"API Error ({e.response.status_code}): {e.response.text}")
         return None
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         st.error("Timeout Error: The model took too long to respond.")
         return None
+    except httpx.TransportError:
+        # Everything else at the transport level: refused/reset connections, HTTP/2 GOAWAY, etc.
+        st.error("Connection Error: Could not reach Groq servers. Check your internet connection.")
+        return None
     except Exception as e:
         st.error(f"Unexpected Error: {e}")
         return None
 
+def _key_fingerprint(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+# Persisted to disk so verdicts survive app restarts. Streamlit does not support ttl with persist,
+# and max_entries only bounds the in-memory layer: files under ~/.streamlit/cache are kept until
+# the cache is cleared.
+@st.cache_data(persist="disk", max_entries=1000, show_spinner=False)
+def _analyze_description_cached(text, model, prompt_version, api_key_fingerprint, _api_key):
+    """
+    Calls Groq and parses the JSON verdict. Cached per (text, model, prompt version, key fingerprint);
+    the raw key is underscore-prefixed so Streamlit never hashes or stores it.
+    Errors propagate so that failed calls are not cached.
+    """
+    prompt = _ANALYZE_PROMPT_TEMPLATE.format(criteria=_GEO_CRITERIA_STR, text=text)
+    
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "Return JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.1,
+        "max_tokens": SCORE_MAX_TOKENS
+    }
+    
+    result = _post_chat(_api_key, payload)
+    _normalize_statuses(result)
+    _validate_json(result, ANALYZE_SCHEMA)
+    return result
+
+def analyze_description_raw(api_key, text, model=SCORING_MODEL):
+    """
+    Uses direct HTTP calls via httpx instead of the SDK to avoid connection errors.
+    Request failures are reported in the UI here, outside the cache.
+    """
+    return _report_request_errors(
+        _analyze_description_cached,
+        normalize_description(text), model, _PROMPT_VERSION, _key_fingerprint(api_key), api_key
+    )
+
+@st.cache_data(persist="disk", max_entries=200, show_spinner=False)
+def _analyze_batch_cached(texts, model, prompt_version, api_key_fingerprint, _api_key):
+    """
+    Scores several descriptions in a single Groq call, so the instructions and
+    criteria are sent once rather than once per description.
+    """
+    numbered = "\n\n".join(f'{i}. "{text}"' for i, text in enumerate(texts, start=1))
+    
+    prompt = _BATCH_PROMPT_TEMPLATE.format(
+        criteria=_GEO_CRITERIA_STR, count=len(texts), numbered=numbered
+    )
+    
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "Return JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.1,
+        "max_tokens": 64 + BATCH_MAX_TOKENS_PER_ITEM * len(texts)
+    }
+    
+    response = _post_chat(_api_key, payload)
+    _validate_json(response, BATCH_SCHEMA)
+    results = response['results']
+    if len(results) != len(texts):
+        raise ValueError(f"Model returned {len(results)} results for {len(texts)} descriptions.")
+    return results
+
+def analyze_batch(api_key, texts, model=SCORING_MODEL):
+    """
+    Batch counterpart of analyze_description_raw; returns one result dict per text.
+    """
+    texts = tuple(normalize_description(text) for text in texts)
+    return _report_request_errors(
+        _analyze_batch_cached, texts, model, _PROMPT_VERSION, _key_fingerprint(api_key), api_key
+    )
+
+def parse_batch_upload(uploaded_file):
+    """
+    Reads descriptions from an uploaded file: one per line for TXT, or the
+    'description' column (falling back to the first column) for CSV.
+    CSV files are expected to start with a header row, which is never scored.
+    """
+    content = uploaded_file.getvalue().decode("utf-8-sig")
+    
+    if uploaded_file.name.lower().endswith(".csv"):
+        rows = list(csv.reader(io.StringIO(content)))
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        col = header.index("description") if "description" in header else 0
+        texts = [row[col] for row in rows[1:] if len(row) > col]
+    else:
+        texts = content.splitlines()
+    
+    return [text.strip() for text in texts if text.strip()]
+
 # --- UI Layout ---
 
+# Build the shared HTTP/2 client (and its lazy h2 import) on page load instead of on the first click
+get_http_client()
+
 with st.sidebar:
     st.header("⚙️ Settings")
     api_key = st.text_input("Groq API Key", type="password")
+    use_large_model = st.toggle(
+        "Use 70B judge",
+        help=f"Scores with {LARGE_SCORING_MODEL} instead of the faster {SCORING_MODEL}."
+    )
+    scoring_model = LARGE_SCORING_MODEL if use_large_model else SCORING_MODEL
+    if st.button("Clear cached scores", help="Deletes every stored verdict, including those persisted to disk."):
+        _analyze_description_cached.clear()
+        _analyze_batch_cached.clear()
+        st.success("Cached scores cleared.")
     st.markdown("---")
     st.markdown("**Criteria:** E-GEO Paper (Table 3)")
 
@@ -154,65 +418,125 @@ st.markdown("Evaluate product descriptions against Generative Engine Optimizatio
 
 if 'result' not in st.session_state:
     st.session_state.result = None
+if 'batch_results' not in st.session_state:
+    st.session_state.batch_results = None
 
 # Input
 st.markdown('<div class="intent-label">INPUT DESCRIPTION</div>', unsafe_allow_html=True)
-input_text = st.text_area("Paste description...", height=200, label_visibility="collapsed", placeholder="Paste description here...")
+# A form holds edits client-side, so pasting or typing does not rerun the script until submit
+with st.form("score_form", border=False):
+    st.text_area("Paste description...", key="input_text", height=200, label_visibility="collapsed", placeholder="Paste description here...")
+    submitted = st.form_submit_button("Calculate Score", type="primary")
 
-if st.button("Calculate Score", type="primary"):
+text_to_score = None
+if submitted:
+    input_text = st.session_state.input_text
     if not api_key:
         st.warning("Please provide a Groq API Key.")
     elif not input_text:
         st.warning("Please enter text.")
     else:
-        with st.spinner("Judging content..."):
-            st.session_state.result = analyze_description_raw(api_key, input_text)
+        text_to_score = input_text
 
 # Results
+# One placeholder holds the whole verdict, so a rerun swaps it as a single element
+# instead of leaving the previous score and breakdown on screen piece by piece
+result_slot = st.empty()
+
+if text_to_score:
+    with st.spinner("Judging content..."):
+        st.session_state.result = analyze_description_raw(api_key, text_to_score, scoring_model)
+
 if st.session_state.result:
-    res = st.session_state.result
-    score = res.get('score', 0)
+    with result_slot.container():
+        res = st.session_state.result
+        score = res['score']
+        critique_summary = res['critique_summary']
     
-    # Color Logic
-    if score >= 80: score_color = "#1a7f37"
-    elif score >= 50: score_color = "#d97706"
-    else: score_color = "#cf222e"
+        # Color Logic
+        if score >= 80: score_color = "#1a7f37"
+        elif score >= 50: score_color = "#d97706"
+        else: score_color = "#cf222e"
 
-    st.markdown('<div class="container-box">', unsafe_allow_html=True)
+        st.markdown('<div class="container-box">', unsafe_allow_html=True)
     
-    c1, c2 = st.columns([1, 2])
+        c1, c2 = st.columns([1, 2])
     
-    with c1:
-        st.markdown('<div class="intent-label">GEO SCORE</div>', unsafe_allow_html=True)
-        st.markdown(f'<p class="score-big" style="color:{score_color}">{score}/100</p>', unsafe_allow_html=True)
+        with c1:
+            st.markdown('<div class="intent-label">GEO SCORE</div>', unsafe_allow_html=True)
+            st.markdown(f'<p class="score-big" style="color:{score_color}">{score}/100</p>', unsafe_allow_html=True)
     
-    with c2:
-        st.markdown('<div class="intent-label">JUDGE\'S FEEDBACK</div>', unsafe_allow_html=True)
-        st.markdown(f"""
-        <div class="user-bubble">
-            {res.get('critique_summary')}
-        </div>
-        """, unsafe_allow_html=True)
+        with c2:
+            st.markdown('<div class="intent-label">JUDGE\'S FEEDBACK</div>', unsafe_allow_html=True)
+            st.markdown(f"""
+            <div class="user-bubble">
+                {to_html(critique_summary)}
+            </div>
+            """, unsafe_allow_html=True)
         
-    st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
 
-    # Breakdown
-    st.markdown('<div class="intent-label">DETAILED PARAMETER BREAKDOWN</div>', unsafe_allow_html=True)
+        # Breakdown
+        st.markdown('<div class="intent-label">DETAILED PARAMETER BREAKDOWN</div>', unsafe_allow_html=True)
     
-    breakdown = res.get('breakdown', {})
-    for criteria, details in breakdown.items():
-        status = details.get('status', 'Fail')
-        comment = details.get('comment', '')
+        # Build every card first and emit them in one st.markdown call
+        breakdown = res['breakdown']
+        html_parts = []
+        for criteria, details in breakdown.items():
+            status, comment = details['status'], details['comment']
+            passed = status == "Pass"
         
-        status_class = "status-pass" if status == "Pass" else "status-fail"
-        icon = "✅" if status == "Pass" else "⚠️"
+            status_class = "status-pass" if passed else "status-fail"
+            icon = "✅" if passed else "⚠️"
         
-        st.markdown(f"""
-        <div style="background: #f6f8fa; padding: 10px; border-radius: 8px; margin-bottom: 8px; border: 1px solid #e1e4e8;">
-            <div style="font-size: 0.85rem; font-weight: 600; color: #24292e;">{criteria}</div>
-            <div style="font-size: 0.95rem;">
-                <span class="{status_class}">{icon} {status}</span>
-                <span style="color: #586069;">{comment}</span>
+            html_parts.append(f"""
+            <div style="background: #f6f8fa; padding: 10px; border-radius: 8px; margin-bottom: 8px; border: 1px solid #e1e4e8;">
+                <div style="font-size: 0.85rem; font-weight: 600; color: #24292e;">{to_html(criteria)}</div>
+                <div style="font-size: 0.95rem;">
+                    <span class="{status_class}">{icon} {status}</span>
+                    <span style="color: #586069;">{to_html(comment)}</span>
+                </div>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
+            """)
+    
+        if html_parts:
+            st.markdown("".join(html_parts), unsafe_allow_html=True)
+
+# Batch Scoring
+st.markdown('<div class="intent-label">BATCH SCORING</div>', unsafe_allow_html=True)
+batch_file = st.file_uploader(
+    "Upload descriptions (TXT: one per line, CSV: header row with a 'description' column)",
+    type=["txt", "csv"]
+)
+
+if st.button("Score Batch"):
+    try:
+        batch_texts = parse_batch_upload(batch_file) if batch_file else []
+        upload_error = None
+    except (UnicodeDecodeError, csv.Error):
+        batch_texts = []
+        upload_error = "Please upload a UTF-8 encoded file."
+    
+    if not api_key:
+        st.warning("Please provide a Groq API Key.")
+    elif upload_error:
+        st.warning(upload_error)
+    elif not batch_texts:
+        st.warning("Please upload a file with at least one description.")
+    else:
+        if len(batch_texts) > BATCH_LIMIT:
+            st.warning(f"Only the first {BATCH_LIMIT} descriptions are scored per batch.")
+            batch_texts = batch_texts[:BATCH_LIMIT]
+        with st.spinner(f"Judging {len(batch_texts)} descriptions..."):
+            results = analyze_batch(api_key, batch_texts, scoring_model)
+        st.session_state.batch_results = None if results is None else [
+            {
+                "Description": text,
+                "Score": item['score'],
+                "Summary": item['critique_summary'],
+            }
+            for text, item in zip(batch_texts, results)
+        ]
+
+if st.session_state.batch_results:
+    st.dataframe(st.session_state.batch_results, use_container_width=True, hide_index=True)